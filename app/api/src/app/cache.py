@@ -0,0 +1,130 @@
+# app/api/src/app/cache.py
+"""Optional Redis-backed response cache shared by all API replicas.
+
+Enable with RESPONSE_CACHE=1; it reuses the Redis that RQ already uses
+(REDIS_URL). Keys embed a per-scope generation number, so invalidation is a
+single INCR (old entries simply age out via their TTL). Concurrent misses for
+the same key are collapsed: one request computes while the others wait for
+its result. Any Redis error falls back to computing the response directly.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import time
+from typing import Callable, Optional
+
+from fastapi import Response
+from redis import Redis
+from redis.exceptions import RedisError
+
+RESPONSE_CACHE = os.getenv("RESPONSE_CACHE", "0").lower() in ("1", "true", "yes", "on")
+CACHE_TTL = int(os.getenv("RESPONSE_CACHE_TTL", "300"))        # seconds
+LOCK_TTL_MS = int(os.getenv("RESPONSE_CACHE_LOCK_MS", "30000"))  # max time one builder holds a key
+LOCK_WAIT = float(os.getenv("RESPONSE_CACHE_WAIT", "10"))        # seconds others wait for it
+# a hung Redis must fail fast (then we compute uncached) rather than block the worker
+REDIS_TIMEOUT = float(os.getenv("RESPONSE_CACHE_REDIS_TIMEOUT", "0.5"))  # seconds
+
+_PREFIX = "oa:resp"
+_KEEP_HEADERS = ("x-next-cursor", "content-disposition")
+_redis: Optional[Redis] = None
+
+
+def _conn() -> Redis:
+    global _redis
+    if _redis is None:
+        _redis = Redis.from_url(
+            os.getenv("REDIS_URL", "redis://localhost:6379/0"),
+            socket_connect_timeout=REDIS_TIMEOUT,
+            socket_timeout=REDIS_TIMEOUT,
+        )
+    return _redis
+
+
+def _gen(r: Redis, scope: str) -> str:
+    return (r.get(f"{_PREFIX}:gen:{scope}") or b"0").decode()
+
+
+def _key(r: Redis, namespace: str, scope: str, parts: dict) -> str:
+    digest = hashlib.sha1(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
+    return f"{_PREFIX}:{namespace}:{scope}:g{_gen(r, scope)}:{digest}"
+
+
+def _dump(resp: Response) -> bytes:
+    meta = {
+        "status": resp.status_code,
+        "media_type": resp.media_type,
+        "headers": {k: v for k, v in resp.headers.items() if k.lower() in _KEEP_HEADERS},
+    }
+    return json.dumps(meta).encode() + b"\n" + bytes(resp.body)
+
+
+def _load(raw: bytes) -> Response:
+    meta, body = raw.split(b"\n", 1)
+    m = json.loads(meta)
+    return Response(content=body, status_code=m["status"], media_type=m["media_type"], headers=m["headers"])
+
+
+def cached_response(namespace: str, scope: str, parts: dict, build: Callable[[], Response]) -> Response:
+    """Return the cached response for (namespace, scope, parts) or build it (single flight).
+
+    *parts* must identify everything the response depends on (query params,
+    file id/hash/size/mtime). *build* must return a fully buffered Response;
+    exceptions it raises (e.g. HTTPException) propagate and nothing is cached.
+    """
+    if not RESPONSE_CACHE:
+        return build()
+    try:
+        r = _conn()
+        key = _key(r, namespace, scope, parts)
+        hit = r.get(key)
+        if hit is not None:
+            return _load(hit)
+        lock = key + ":lock"
+        owner = bool(r.set(lock, b"1", nx=True, px=LOCK_TTL_MS))
+        if not owner:
+            deadline = time.monotonic() + LOCK_WAIT
+            while time.monotonic() < deadline:
+                time.sleep(0.05)
+                hit = r.get(key)
+                if hit is not None:
+                    return _load(hit)
+                if not r.exists(lock):
+                    break  # builder failed; compute ourselves
+    except RedisError:
+        return build()
+
+    try:
+        resp = build()
+        if 200 <= resp.status_code < 300:
+            try:
+                r.set(key, _dump(resp), ex=CACHE_TTL)
+            except RedisError:
+                pass
+        return resp
+    finally:
+        if owner:
+            try:
+                r.delete(lock)
+            except RedisError:
+                pass
+
+
+def invalidate(*scopes: str) -> None:
+    """Bump the generation of each scope so its cached responses are no longer served."""
+    if not RESPONSE_CACHE:
+        return
+    try:
+        r = _conn()
+        for scope in scopes:
+            r.incr(f"{_PREFIX}:gen:{scope}")
+    except RedisError:
+        pass
+
+
+def dataset_scope(dataset_id: int) -> str:
+    return f"ds:{dataset_id}"
+
+
+DATASETS_SCOPE = "datasets"
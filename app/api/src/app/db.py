@@ -1,4 +1,5 @@
 # app/api/src/app/db.py
+from sqlalchemy import inspect, text
 from sqlmodel import SQLModel, create_engine, Session
 import os
 
@@ -10,8 +11,32 @@ DATABASE_URL = os.getenv(
 
 engine = create_engine(DATABASE_URL, echo=False)
 
+def _add_missing_columns() -> None:
+    """Additive migration: create_all skips existing tables, so add columns introduced later.
+
+    Columns are added as nullable and existing rows keep NULL (e.g. job.created_at:
+    the real creation time is unknown, so those jobs list after dated ones).
+    """
+    insp = inspect(engine)
+    q = engine.dialect.identifier_preparer.quote
+    with engine.begin() as conn:
+        for table in SQLModel.metadata.sorted_tables:
+            if not insp.has_table(table.name):
+                continue
+            existing = {c["name"] for c in insp.get_columns(table.name)}
+            for col in table.columns:
+                if col.name in existing:
+                    continue
+                ddl = col.type.compile(dialect=engine.dialect)
+                conn.execute(text(f"ALTER TABLE {q(table.name)} ADD COLUMN {q(col.name)} {ddl}"))
+
 def create_db_and_tables() -> None:
     SQLModel.metadata.create_all(engine)
+    _add_missing_columns()
+    # create_all skips tables that already exist; add indexes introduced later
+    for table in SQLModel.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(engine, checkfirst=True)
 
 def get_session() -> Session:
     with Session(engine) as session:
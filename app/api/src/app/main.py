@@ -2,15 +2,19 @@
 from pathlib import Path
 from typing import List, Optional
 
-import os, io, csv
+import os, io, csv, json
+import tarfile, threading, zipfile
+from concurrent.futures import ThreadPoolExecutor
 import chardet
 import pandas as pd
 import numpy as np
 
-from fastapi import FastAPI, Depends, HTTPException, UploadFile, File
+from fastapi import FastAPI, Depends, HTTPException, UploadFile, File, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse, FileResponse
+from fastapi.responses import StreamingResponse, FileResponse, JSONResponse
+from fastapi.encoders import jsonable_encoder
 
+from sqlalchemy import Index, and_, or_
 from sqlmodel import SQLModel, Field, Session, select
 from datetime import date, datetime
 from uuid import UUID
@@ -28,9 +32,27 @@ from rq import Queue
 from app.auth import require_user
 
 # Models & DB helpers
-from app.models import Job
+from app.models import Job, FileRecord, FileProfile
 from app.db import create_db_and_tables, get_session
 
+# Raw storage (transparent .gz/.zst/.zip handling)
+from app.storage import (
+    open_raw, read_head, save_upload, plain_name, compression_of, compress_frame,
+    file_sha256, member_name, iter_archive,
+)
+
+# Timestamp engine (cached explicit formats, split date + time columns)
+from app.timeparse import TIMESTAMP_COL, attach_timestamp, parse_column
+
+# Shared Redis response cache (optional; RESPONSE_CACHE=1)
+from app.cache import cached_response, invalidate, dataset_scope, DATASETS_SCOPE
+
+# Persisted profile + rollups (incrementally mergeable)
+from app.profiling import (
+    update_profile, compute_profile, apply_profile, profile_summary, pick_rollup, rollup_series,
+    naive_utc, coerce_profiled,
+)
+
 # ---- FastAPI app + CORS ----
 app = FastAPI(title="OA DataHub API", version=os.getenv("APP_VERSION", "0.1.0"))
 
@@ -41,11 +63,15 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 DATA_DIR = Path(os.getenv("DATA_DIR", "/app/data/raw"))
 DATA_DIR.mkdir(parents=True, exist_ok=True)
 
+# worker threads for archive ingestion (hashing/sniffing/profiling per member)
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", str(min(8, os.cpu_count() or 1))))
+
 @app.on_event("startup")
 def on_startup():
     create_db_and_tables()
@@ -67,6 +93,7 @@ class DatasetBase(SQLModel):
     source: str
 
 class Dataset(DatasetBase, table=True):
+    __table_args__ = (Index("ix_dataset_region_id", "region", "id"),)
     id: int | None = Field(default=None, primary_key=True)
 
 class DatasetRead(DatasetBase):
@@ -75,13 +102,6 @@ class DatasetRead(DatasetBase):
 class DatasetCreate(DatasetBase):
     pass
 
-class FileRecord(SQLModel, table=True):
-    id: int | None = Field(default=None, primary_key=True)
-    dataset_id: int = Field(index=True)
-    original_name: str
-    stored_path: str  # relative to /app (e.g., data/raw/1/file.csv)
-    bytes: int
-
 # ---- Users table (Supabase-backed identities) ----
 class User(SQLModel, table=True):
     id: UUID = Field(primary_key=True)            # Supabase auth user id
@@ -108,6 +128,32 @@ def require_role(user: User, *allowed: str):
         raise HTTPException(status_code=403, detail="Forbidden")
 
 # ---------- Helpers ----------
+PAGE_LIMIT_MAX = 1000
+
+def _page(response: Response, rows: list, limit: int, cursor_of) -> list:
+    """Trim a limit+1 keyset fetch and expose the next cursor via X-Next-Cursor."""
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers["X-Next-Cursor"] = cursor_of(rows[-1])
+    return rows
+
+def _json(content, headers: dict | None = None) -> JSONResponse:
+    """Buffered JSON response (what the response cache stores)."""
+    return JSONResponse(content=jsonable_encoder(content), headers=headers)
+
+def _file_identity(rec, path: Path) -> dict:
+    """Cache-key parts identifying a stored file's current contents."""
+    st = path.stat()
+    return {"file_id": rec.id, "ingest_sha256": rec.ingest_sha256, "size": st.st_size, "mtime": st.st_mtime_ns}
+
+def _int_cursor(cursor: Optional[str]) -> Optional[int]:
+    if cursor is None:
+        return None
+    try:
+        return int(cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
 def _get_queue() -> Queue:
     # Default to localhost unless REDIS_URL provided
     url = os.getenv("REDIS_URL", "redis://localhost:6379/0")
@@ -131,19 +177,36 @@ def _detect_delimiter(text_sample: str) -> str:
     except Exception:
         return ","
 
-def _read_csv_head(path: Path, nrows: int = 50) -> pd.DataFrame:
-    raw = path.read_bytes()[:200_000]
+def _sniff(path: Path, nbytes: int) -> tuple[str, str]:
+    """Detect (encoding, delimiter) from the first decompressed bytes of a raw file."""
+    raw = read_head(path, nbytes)
     enc = _detect_encoding(raw)
     text = raw.decode(enc, errors="replace")
-    delim = _detect_delimiter(text)
-    return pd.read_csv(path, nrows=nrows, encoding=enc, sep=delim)
-
-def _read_csv_full(path: Path) -> pd.DataFrame:
-    raw = path.read_bytes()[:400_000]
-    enc = _detect_encoding(raw)
-    text = raw.decode(enc, errors="replace")
-    delim = _detect_delimiter(text)
-    return pd.read_csv(path, encoding=enc, sep=delim)
+    return enc, _detect_delimiter(text)
+
+def _file_key(path: Path) -> tuple:
+    """Identity of a stored file's current contents (cache key for parsed formats)."""
+    st = path.stat()
+    return (str(path), st.st_mtime_ns, st.st_size)
+
+def _with_timestamp(df: pd.DataFrame, path: Path) -> pd.DataFrame:
+    """Attach the canonical UTC timestamp column (see app.timeparse)."""
+    df.attrs["timestamp_sources"] = attach_timestamp(df, _file_key(path))
+    return df
+
+# Readers attach the derived timestamp column unless timestamp=False
+# (preview/export show the file's own columns only).
+def _read_csv_head(path: Path, nrows: int = 50, timestamp: bool = True) -> pd.DataFrame:
+    enc, delim = _sniff(path, 200_000)
+    with open_raw(path) as fh:
+        df = pd.read_csv(fh, nrows=nrows, encoding=enc, sep=delim)
+    return _with_timestamp(df, path) if timestamp else df
+
+def _read_csv_full(path: Path, timestamp: bool = True) -> pd.DataFrame:
+    enc, delim = _sniff(path, 400_000)
+    with open_raw(path) as fh:
+        df = pd.read_csv(fh, encoding=enc, sep=delim)
+    return _with_timestamp(df, path) if timestamp else df
 
 def _df_schema(df: pd.DataFrame) -> list[dict]:
     nn = df.notna().sum()
@@ -151,15 +214,13 @@ def _df_schema(df: pd.DataFrame) -> list[dict]:
 
 def _read_csv_sample(path: Path, max_rows: int = 5000) -> pd.DataFrame:
     """Read a moderate, bounded sample with sniffed encoding/delimiter."""
-    raw = path.read_bytes()[:400_000]
-    enc = _detect_encoding(raw)
-    text = raw.decode(enc, errors="replace")
-    delim = _detect_delimiter(text)
-    return pd.read_csv(path, nrows=max_rows, encoding=enc, sep=delim)
+    enc, delim = _sniff(path, 400_000)
+    with open_raw(path) as fh:
+        return _with_timestamp(pd.read_csv(fh, nrows=max_rows, encoding=enc, sep=delim), path)
 
 # --- alias mapper (used by geojson) ---
 CANONICAL = {
-    "time": ["time", "date", "datetime", "timestamp", "sample_time"],
+    "time": [TIMESTAMP_COL, "time", "date", "datetime", "timestamp", "sample_time"],
     "latitude": ["latitude", "lat"],
     "longitude": ["longitude", "lon", "long", "lng"],
 }
@@ -175,6 +236,19 @@ def _normalize_columns(df: pd.DataFrame) -> dict:
                 break
     return mapping
 
+def _time_values(df: pd.DataFrame, path: Path, time_col: Optional[str]) -> tuple[Optional[pd.Series], Optional[str]]:
+    """UTC timestamps for *time_col* (or the canonical time column when omitted).
+
+    Naming either half of a split date/time pair resolves to the assembled column.
+    """
+    sources = df.attrs.get("timestamp_sources") or []
+    if TIMESTAMP_COL in df.columns and (time_col is None or time_col in sources or time_col == TIMESTAMP_COL):
+        return df[TIMESTAMP_COL], TIMESTAMP_COL
+    name = time_col or _normalize_columns(df).get("time")
+    if not name or name not in df.columns:
+        return None, name
+    return parse_column(df, name, _file_key(path)), name
+
 # ---------- Who am I ----------
 @app.get("/me")
 def me(session: Session = Depends(get_session), claims: dict = Depends(require_user)):
@@ -183,8 +257,33 @@ def me(session: Session = Depends(get_session), claims: dict = Depends(require_u
 
 # ---------- Dataset Endpoints ----------
 @app.get("/datasets", response_model=List[DatasetRead])
-def list_datasets(session: Session = Depends(get_session)):
-    return session.exec(select(Dataset).order_by(Dataset.id)).all()
+def list_datasets(
+    region: str | None = None,
+    start: date | None = None,            # overlap filter: dataset ends on/after start
+    end: date | None = None,              # ... and starts on/before end
+    cursor: str | None = None,            # from the previous page's X-Next-Cursor
+    limit: int = 100,
+    session: Session = Depends(get_session),
+):
+    limit = max(1, min(limit, PAGE_LIMIT_MAX))
+    after = _int_cursor(cursor)
+
+    def build() -> Response:
+        q = select(Dataset)
+        if region:
+            q = q.where(Dataset.region == region)
+        if start:
+            q = q.where(Dataset.end_date >= start)
+        if end:
+            q = q.where(Dataset.start_date <= end)
+        if after is not None:
+            q = q.where(Dataset.id > after)
+        resp = Response()
+        rows = _page(resp, session.exec(q.order_by(Dataset.id).limit(limit + 1)).all(), limit, lambda d: str(d.id))
+        return _json([DatasetRead.model_validate(d) for d in rows], dict(resp.headers))
+
+    parts = {"region": region, "start": start, "end": end, "cursor": after, "limit": limit}
+    return cached_response("datasets", DATASETS_SCOPE, parts, build)
 
 # Protected: only owners/admins
 @app.post("/datasets", response_model=DatasetRead, status_code=201)
@@ -200,6 +299,7 @@ def create_dataset(
     session.add(item)
     session.commit()
     session.refresh(item)
+    invalidate(DATASETS_SCOPE)
     return item
 
 @app.get("/datasets/{dataset_id}", response_model=DatasetRead)
@@ -217,11 +317,12 @@ def delete_dataset(dataset_id: int, session: Session = Depends(get_session), cla
     if item:
         session.delete(item)
         session.commit()
+        invalidate(DATASETS_SCOPE, dataset_scope(dataset_id))
 
 # ---------- File Upload + List ----------
 # Auth required, any role
 @app.post("/datasets/{dataset_id}/files", response_model=dict, status_code=201)
-async def upload_file(
+def upload_file(
     dataset_id: int,
     f: UploadFile = File(...),
     session: Session = Depends(get_session),
@@ -236,43 +337,292 @@ async def upload_file(
     target_dir = DATA_DIR / str(dataset_id)
     target_dir.mkdir(parents=True, exist_ok=True)
 
-    target_path = target_dir / f.filename
-    content = await f.read()
-    target_path.write_bytes(content)
+    # .csv.gz / .csv.zst / .zip are kept as sent; plain CSVs may be compressed at rest;
+    # an existing stored file of the same name is kept (the new one gets a numbered name)
+    try:
+        target_path = save_upload(f.file, target_dir / Path(f.filename).name)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
     rel_path = target_path.relative_to(Path("/app"))
     rec = FileRecord(
         dataset_id=dataset_id,
         original_name=f.filename,
         stored_path=str(rel_path).replace("\\", "/"),
-        bytes=len(content),
+        bytes=target_path.stat().st_size,
+        ingest_sha256=file_sha256(target_path),
     )
     session.add(rec)
     session.commit()
     session.refresh(rec)
 
+    prof = _profile_full(session, rec, target_path)
+    invalidate(dataset_scope(dataset_id))
+
     return {
         "file_id": rec.id,
         "dataset_id": dataset_id,
         "original_name": rec.original_name,
         "stored_path": rec.stored_path,
         "bytes": rec.bytes,
-        "tip": "Saved under data/raw/<dataset_id>/ on your host.",
+        "ingest_sha256": rec.ingest_sha256,
+        "rows": prof.row_count if prof else None,
+        "tip": "Saved under data/raw/<dataset_id>/ on your host (.gz/.zst/.zip read transparently).",
     }
 
 @app.get("/datasets/{dataset_id}/files", response_model=list[dict])
-def list_dataset_files(dataset_id: int, session: Session = Depends(get_session)):
-    rows = session.exec(select(FileRecord).where(FileRecord.dataset_id == dataset_id)).all()
-    return [
+def list_dataset_files(
+    dataset_id: int,
+    start: datetime | None = None,        # overlap filter on the profiled time range (UTC)
+    end: datetime | None = None,
+    cursor: str | None = None,
+    limit: int = 100,
+    session: Session = Depends(get_session),
+):
+    limit = max(1, min(limit, PAGE_LIMIT_MAX))
+    after = _int_cursor(cursor)
+
+    def build() -> Response:
+        q = select(FileRecord).where(FileRecord.dataset_id == dataset_id)
+        if start or end:
+            q = q.join(FileProfile, FileProfile.file_id == FileRecord.id)
+            if start:
+                q = q.where(FileProfile.time_max >= naive_utc(start))
+            if end:
+                q = q.where(FileProfile.time_min <= naive_utc(end))
+        if after is not None:
+            q = q.where(FileRecord.id > after)
+        resp = Response()
+        rows = _page(resp, session.exec(q.order_by(FileRecord.id).limit(limit + 1)).all(), limit, lambda r: str(r.id))
+        return _json([
+            {
+                "file_id": r.id,
+                "dataset_id": r.dataset_id,
+                "original_name": r.original_name,
+                "stored_path": r.stored_path,
+                "bytes": r.bytes,
+                "ingest_sha256": r.ingest_sha256,
+            }
+            for r in rows
+        ], dict(resp.headers))
+
+    parts = {"start": start, "end": end, "cursor": after, "limit": limit}
+    return cached_response("files", dataset_scope(dataset_id), parts, build)
+
+# ---------- Bulk archive upload ----------
+def _ingest_member(path: Path) -> dict:
+    """Hash, sniff and profile one extracted member (runs in a worker thread; no DB access)."""
+    out = {"ingest_sha256": file_sha256(path), "bytes": path.stat().st_size, "profile": None, "error": None}
+    try:
+        df = _read_csv_full(path)
+        out["profile"] = compute_profile(df, _file_key(path))
+    except Exception as e:
+        out["error"] = f"Failed to read CSV: {e}"
+    return out
+
+# Auth required, any role
+@app.post("/datasets/{dataset_id}/archives", response_model=dict, status_code=201)
+def upload_archive(
+    dataset_id: int,
+    f: UploadFile = File(...),
+    session: Session = Depends(get_session),
+    claims: dict = Depends(require_user),
+):
+    """Ingest every CSV member of a zip/tar bundle in one request.
+
+    Members are streamed to data/raw/<dataset_id>/ (nested paths flattened with '__',
+    numbered if the name is already taken), processed in parallel, and all
+    FileRecords are inserted in a single transaction.
+    """
+    _ = get_or_create_user(claims, session)  # any role
+
+    ds = session.get(Dataset, dataset_id)
+    if not ds:
+        raise HTTPException(status_code=404, detail="Dataset not found")
+
+    target_dir = DATA_DIR / str(dataset_id)
+    target_dir.mkdir(parents=True, exist_ok=True)
+
+    # 1) stream members to disk (archive order; tar is forward-only)
+    members: list[tuple[str, Path]] = []
+    skipped: list[str] = []
+    try:
+        for name, fh in iter_archive(f.file, f.filename or ""):
+            flat = member_name(name)
+            if not flat:
+                skipped.append(name)
+                continue
+            members.append((name, save_upload(fh, target_dir / flat)))
+    except (ValueError, zipfile.BadZipFile, tarfile.TarError) as e:
+        raise HTTPException(status_code=400, detail=f"Failed to read archive: {e}")
+    if not members:
+        raise HTTPException(status_code=400, detail="Archive contains no CSV files")
+
+    # 2) hash + sniff + profile in parallel
+    with ThreadPoolExecutor(max_workers=max(1, INGEST_WORKERS)) as pool:
+        results = list(pool.map(_ingest_member, [p for _, p in members]))
+
+    # 3) one transaction for all records, profiles and rollups
+    recs = [
+        FileRecord(
+            dataset_id=dataset_id,
+            original_name=Path(name).name,
+            stored_path=str(path.relative_to(Path("/app"))).replace("\\", "/"),
+            bytes=res["bytes"],
+            ingest_sha256=res["ingest_sha256"],
+        )
+        for (name, path), res in zip(members, results)
+    ]
+    session.add_all(recs)
+    session.flush()  # assigns ids
+    for rec, res in zip(recs, results):
+        if res["profile"]:
+            apply_profile(session, rec.id, res["profile"], new=True)
+    files = [
         {
-            "file_id": r.id,
-            "dataset_id": r.dataset_id,
-            "original_name": r.original_name,
-            "stored_path": r.stored_path,
-            "bytes": r.bytes,
+            "member": name,
+            "file_id": rec.id,
+            "stored_path": rec.stored_path,
+            "bytes": rec.bytes,
+            "ingest_sha256": rec.ingest_sha256,
+            "rows": res["profile"]["rows"] if res["profile"] else None,
+            "error": res["error"],
         }
-        for r in rows
+        for (name, _), rec, res in zip(members, recs, results)
     ]
+    session.commit()
+    invalidate(dataset_scope(dataset_id))
+
+    return {"dataset_id": dataset_id, "ingested": len(files), "skipped": skipped, "files": files}
+
+# ---------- Append + profile ----------
+def _profile_full(session: Session, rec: FileRecord, path: Path) -> Optional[FileProfile]:
+    """Build the persisted profile/rollups from the whole file (best-effort).
+
+    Files that cannot be read or profiled get no profile; only DB errors surface.
+    """
+    try:
+        delta = compute_profile(_read_csv_full(path), _file_key(path))
+    except Exception:
+        session.rollback()
+        return None
+    try:
+        prof = apply_profile(session, rec.id, delta)
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    return prof
+
+# per-file append locks (in-process; see append_rows)
+_APPEND_LOCKS: dict[int, threading.Lock] = {}
+
+# Auth required, any role
+@app.post("/datasets/{dataset_id}/files/{file_id}/append", response_model=dict)
+def append_rows(
+    dataset_id: int,
+    file_id: int,
+    f: UploadFile = File(...),
+    session: Session = Depends(get_session),
+    claims: dict = Depends(require_user),
+):
+    """Append a CSV batch (same header) to a stored file and fold it into the profile.
+
+    Only the batch is parsed and profiled; compressed files get one extra frame.
+    """
+    _ = get_or_create_user(claims, session)  # any role
+
+    rec = session.get(FileRecord, file_id)
+    if not rec or rec.dataset_id != dataset_id:
+        raise HTTPException(status_code=404, detail="File not found for this dataset")
+    path = Path("/app") / rec.stored_path
+    if not path.exists():
+        raise HTTPException(status_code=404, detail=f"File not found on disk: {rec.stored_path}")
+    kind = compression_of(path)
+    if kind == "zip":
+        raise HTTPException(status_code=400, detail="Zip-stored files cannot be appended; upload as .csv or .csv.gz")
+
+    # target layout: header, encoding and delimiter of the stored file
+    enc, delim = _sniff(path, 200_000)
+    with open_raw(path) as fh:
+        header = list(pd.read_csv(fh, nrows=0, encoding=enc, sep=delim).columns)
+    if enc.lower() == "ascii":
+        enc = "utf-8"
+
+    content = f.file.read()
+    b_enc = _detect_encoding(content[:200_000])
+    b_delim = _detect_delimiter(content[:200_000].decode(b_enc, errors="replace"))
+    try:
+        # raw strings are re-serialized verbatim; the typed frame feeds the profile
+        raw = pd.read_csv(io.BytesIO(content), encoding=b_enc, sep=b_delim, dtype=str, keep_default_na=False)
+        typed = pd.read_csv(io.BytesIO(content), encoding=b_enc, sep=b_delim)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Failed to read CSV batch: {e}")
+
+    missing = [c for c in header if c not in raw.columns]
+    extra = [c for c in raw.columns if c not in header]
+    if missing or extra:
+        raise HTTPException(status_code=400, detail=f"Batch header mismatch (missing={missing}, extra={extra})")
+    if raw.empty:
+        raise HTTPException(status_code=400, detail="Batch has no rows")
+
+    payload = raw[header].to_csv(index=False, header=False, sep=delim, lineterminator="\n").encode(enc, errors="replace")
+
+    # one writer per file: the row lock serializes replicas (Postgres), the local
+    # lock covers threads of this process; file + profile change in one critical section
+    with _APPEND_LOCKS.setdefault(file_id, threading.Lock()):
+        rec = session.exec(
+            select(FileRecord).where(FileRecord.id == file_id).with_for_update().execution_options(populate_existing=True)
+        ).one()
+        orig_size = path.stat().st_size
+        try:
+            if kind:
+                # can't cheaply check the trailing newline; a blank line is skipped by readers
+                with path.open("ab") as out:
+                    out.write(compress_frame(b"\n" + payload, kind))
+            else:
+                with path.open("rb+") as out:
+                    out.seek(0, os.SEEK_END)
+                    if out.tell():
+                        out.seek(-1, os.SEEK_END)
+                        if out.read(1) != b"\n":
+                            out.write(b"\n")
+                    out.write(payload)
+
+            rec.bytes = path.stat().st_size
+            session.add(rec)
+            existing = session.get(FileProfile, rec.id)
+            if existing is None:
+                # first append to a file ingested before profiling existed: one full pass
+                prof = update_profile(session, rec.id, _read_csv_full(path), _file_key(path))
+            else:
+                prof = update_profile(session, rec.id, coerce_profiled(typed[header].copy(), existing))
+            session.commit()
+        except Exception:
+            # keep file and persisted stats in sync: undo the write
+            session.rollback()
+            with path.open("rb+") as out:
+                out.truncate(orig_size)
+            raise
+    invalidate(dataset_scope(dataset_id))
+
+    return {
+        "file_id": rec.id,
+        "dataset_id": dataset_id,
+        "rows_appended": len(raw),
+        "bytes": rec.bytes,
+        "profile": profile_summary(prof) if prof else None,
+    }
+
+@app.get("/datasets/{dataset_id}/files/{file_id}/profile", response_model=dict)
+def file_profile(dataset_id: int, file_id: int, session: Session = Depends(get_session)):
+    rec = session.get(FileRecord, file_id)
+    if not rec or rec.dataset_id != dataset_id:
+        raise HTTPException(status_code=404, detail="File not found for this dataset")
+    prof = session.get(FileProfile, file_id)
+    if not prof:
+        raise HTTPException(status_code=404, detail="Profile not available (file not yet profiled)")
+    return profile_summary(prof)
 
 # ---------- Preview Endpoint ----------
 @app.get("/datasets/{dataset_id}/preview", response_model=dict)
@@ -292,20 +642,24 @@ def preview_dataset(
     if not path.exists():
         raise HTTPException(status_code=404, detail=f"File not found on disk: {rec.stored_path}")
 
-    try:
-        df = _read_csv_head(path, nrows=max(1, min(nrows, 200)))
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Failed to read CSV: {e}")
+    def build() -> Response:
+        try:
+            df = _read_csv_head(path, nrows=max(1, min(nrows, 200)), timestamp=False)
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=f"Failed to read CSV: {e}")
+
+        sample = df.head(min(len(df), nrows)).fillna("").astype(str).to_dict(orient="records")
+        return _json({
+            "file_id": rec.id,
+            "stored_path": rec.stored_path,
+            "rows_previewed": len(sample),
+            "columns": _df_schema(df),
+            "data": sample,
+            "note": "Preview reads only the first chunk and infers delimiter/encoding.",
+        })
 
-    sample = df.head(min(len(df), nrows)).fillna("").astype(str).to_dict(orient="records")
-    return {
-        "file_id": rec.id,
-        "stored_path": rec.stored_path,
-        "rows_previewed": len(sample),
-        "columns": _df_schema(df),
-        "data": sample,
-        "note": "Preview reads only the first chunk and infers delimiter/encoding.",
-    }
+    parts = {"nrows": nrows, **_file_identity(rec, path)}
+    return cached_response("preview", dataset_scope(dataset_id), parts, build)
 
 # ---------- Jobs (enqueue + status) ----------
 # Auth required, any role
@@ -327,7 +681,7 @@ def create_job(
 
     q_ = _get_queue()
     # enqueue by string path to avoid importing tasks here
-    job = q_.enqueue("app.tasks.process_csv", dataset_id, rec.stored_path, y, job_timeout=600)
+    job = q_.enqueue("app.tasks.process_csv", dataset_id, rec.stored_path, y, file_id=rec.id, job_timeout=600)
 
     item = Job(id=job.id, dataset_id=dataset_id, file_path=rec.stored_path, type="process_csv", status="queued")
     session.add(item)
@@ -335,6 +689,56 @@ def create_job(
 
     return {"job_id": job.id, "status": "queued", "dataset_id": dataset_id, "file_id": rec.id, "y": y}
 
+@app.get("/jobs", response_model=list[dict])
+def list_jobs(
+    response: Response,
+    dataset_id: int | None = None,
+    status: str | None = None,            # queued|started|succeeded|failed (as recorded in the DB)
+    start: datetime | None = None,        # created_at window (UTC)
+    end: datetime | None = None,
+    cursor: str | None = None,            # "<created_at iso>|<job id>", newest first (undated rows last)
+    limit: int = 100,
+    session: Session = Depends(get_session),
+):
+    limit = max(1, min(limit, PAGE_LIMIT_MAX))
+    q = select(Job)
+    if dataset_id is not None:
+        q = q.where(Job.dataset_id == dataset_id)
+    if status:
+        q = q.where(Job.status == status)
+    if start:
+        q = q.where(Job.created_at >= naive_utc(start))
+    if end:
+        q = q.where(Job.created_at <= naive_utc(end))
+    if cursor:
+        try:
+            c_at, c_id = cursor.split("|", 1)
+            c_at = datetime.fromisoformat(c_at) if c_at else None
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        if c_at is None:
+            q = q.where(Job.created_at.is_(None), Job.id < c_id)
+        else:
+            q = q.where(or_(
+                Job.created_at < c_at,
+                and_(Job.created_at == c_at, Job.id < c_id),
+                Job.created_at.is_(None),
+            ))
+    rows = session.exec(q.order_by(Job.created_at.desc().nulls_last(), Job.id.desc()).limit(limit + 1)).all()
+    rows = _page(response, rows, limit, lambda j: f"{j.created_at.isoformat() if j.created_at else ''}|{j.id}")
+    return [
+        {
+            "job_id": j.id,
+            "dataset_id": j.dataset_id,
+            "file_path": j.file_path,
+            "type": j.type,
+            "status": j.status,
+            "created_at": j.created_at.isoformat() + "Z" if j.created_at else None,
+            "result_path": j.result_path,
+        }
+        for j in rows
+    ]
+
 @app.get("/jobs/{job_id}", response_model=dict)
 def get_job(job_id: str, session: Session = Depends(get_session)):
     q_ = _get_queue()
@@ -377,21 +781,24 @@ def job_result(job_id: str, session: Session = Depends(get_session)):
         raise HTTPException(status_code=404, detail="Result file missing on disk")
     return FileResponse(p, media_type="text/csv", filename=p.name)
 
-# ---------- Time series PNG (generic y vs time) ----------
-@app.get("/datasets/{dataset_id}/timeseries")
-def plot_timeseries(
-    dataset_id: int,
-    y: str,
-    time_col: str = "time",
-    file_id: int | None = None,
-    resample: str | None = None,
-    session: Session = Depends(get_session),
-):
-    q = select(FileRecord).where(FileRecord.dataset_id == dataset_id)
-    q = q.where(FileRecord.id == file_id) if file_id is not None else q.order_by(FileRecord.id.desc())
-    rec = session.exec(q).first()
-    if not rec:
-        raise HTTPException(status_code=404, detail="No files found for this dataset")
+# ---------- Time series (PNG + JSON; served from rollups when possible) ----------
+def _timeseries_frame(
+    session: Session, rec: FileRecord, y: str, time_col: Optional[str], resample: Optional[str],
+) -> tuple[pd.DataFrame, str, str]:
+    """(frame[mean,min,max,count] indexed by UTC time, time label, source).
+
+    With a resample rule, the coarsest precomputed rollup whose buckets nest in
+    the rule is re-binned instead of reading the raw file.
+    """
+    freq = pick_rollup(resample) if resample else None
+    prof = session.get(FileProfile, rec.id) if freq else None
+    if prof and y in json.loads(prof.column_stats or "{}"):
+        sources = prof.time_source.split(",") if prof.time_source else []
+        if time_col is None or time_col == TIMESTAMP_COL or time_col in sources:
+            ts = rollup_series(session, rec.id, y, freq, resample)
+            if int(ts["count"].sum()) == 0:
+                raise HTTPException(status_code=400, detail="No valid (time, value) rows to plot.")
+            return ts, TIMESTAMP_COL, f"rollup:{freq}"
 
     path = Path("/app") / rec.stored_path
     if not path.exists():
@@ -402,12 +809,12 @@ def plot_timeseries(
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Failed to read CSV: {e}")
 
-    if time_col not in df.columns:
-        raise HTTPException(status_code=400, detail=f"Time column '{time_col}' not found.")
+    t, time_col = _time_values(df, path, time_col)
+    if t is None:
+        raise HTTPException(status_code=400, detail=f"Time column '{time_col or 'time'}' not found.")
     if y not in df.columns:
         raise HTTPException(status_code=400, detail=f"Y column '{y}' not found.")
 
-    t = pd.to_datetime(df[time_col], errors="coerce", utc=True)
     s = pd.to_numeric(df[y], errors="coerce")
     sel = ~(t.isna() | s.isna())
     ts = pd.DataFrame({"t": t[sel], "y": s[sel]}).sort_values("t").set_index("t")
@@ -416,22 +823,87 @@ def plot_timeseries(
 
     if resample:
         try:
-            ts = ts.resample(resample).mean()
+            ts = ts["y"].resample(resample).agg(["mean", "min", "max", "count"])
         except Exception:
             raise HTTPException(status_code=400, detail="Invalid resample rule (try 'D' or 'M').")
+    else:
+        ts = pd.DataFrame({"mean": ts["y"], "min": ts["y"], "max": ts["y"], "count": 1})
+    return ts, time_col, "raw"
 
-    fig, ax = plt.subplots(figsize=(6, 3))
-    ax.plot(ts.index, ts["y"])
-    ax.set_xlabel(time_col)
-    ax.set_ylabel(y)
-    ax.set_title(f"{y} vs {time_col}")
-    fig.tight_layout()
+@app.get("/datasets/{dataset_id}/timeseries")
+def plot_timeseries(
+    dataset_id: int,
+    y: str,
+    time_col: str | None = None,
+    file_id: int | None = None,
+    resample: str | None = None,
+    session: Session = Depends(get_session),
+):
+    q = select(FileRecord).where(FileRecord.dataset_id == dataset_id)
+    q = q.where(FileRecord.id == file_id) if file_id is not None else q.order_by(FileRecord.id.desc())
+    rec = session.exec(q).first()
+    if not rec:
+        raise HTTPException(status_code=404, detail="No files found for this dataset")
 
-    buf = io.BytesIO()
-    fig.savefig(buf, format="png", dpi=150)
-    plt.close(fig)
-    buf.seek(0)
-    return StreamingResponse(buf, media_type="image/png")
+    path = Path("/app") / rec.stored_path
+    if not path.exists():
+        raise HTTPException(status_code=404, detail=f"File not found on disk: {rec.stored_path}")
+
+    def build() -> Response:
+        ts, label, _ = _timeseries_frame(session, rec, y, time_col, resample)
+
+        fig, ax = plt.subplots(figsize=(6, 3))
+        ax.plot(ts.index, ts["mean"])
+        ax.set_xlabel(label)
+        ax.set_ylabel(y)
+        ax.set_title(f"{y} vs {label}")
+        fig.tight_layout()
+
+        buf = io.BytesIO()
+        fig.savefig(buf, format="png", dpi=150)
+        plt.close(fig)
+        return Response(content=buf.getvalue(), media_type="image/png")
+
+    parts = {"y": y, "time_col": time_col, "resample": resample, **_file_identity(rec, path)}
+    return cached_response("timeseries.png", dataset_scope(dataset_id), parts, build)
+
+@app.get("/datasets/{dataset_id}/timeseries/data", response_model=dict)
+def timeseries_data(
+    dataset_id: int,
+    y: str,
+    time_col: str | None = None,
+    file_id: int | None = None,
+    resample: str | None = None,
+    session: Session = Depends(get_session),
+):
+    q = select(FileRecord).where(FileRecord.dataset_id == dataset_id)
+    q = q.where(FileRecord.id == file_id) if file_id is not None else q.order_by(FileRecord.id.desc())
+    rec = session.exec(q).first()
+    if not rec:
+        raise HTTPException(status_code=404, detail="No files found for this dataset")
+
+    path = Path("/app") / rec.stored_path
+    if not path.exists():
+        raise HTTPException(status_code=404, detail=f"File not found on disk: {rec.stored_path}")
+
+    def build() -> Response:
+        ts, label, source = _timeseries_frame(session, rec, y, time_col, resample)
+        ts = ts[ts["count"] > 0]
+        return _json({
+            "file_id": rec.id,
+            "y": y,
+            "time_col": label,
+            "resample": resample,
+            "source": source,
+            "points": [
+                {"t": t.isoformat(), "mean": float(r["mean"]), "min": float(r["min"]),
+                 "max": float(r["max"]), "count": int(r["count"])}
+                for t, r in ts.iterrows()
+            ],
+        })
+
+    parts = {"y": y, "time_col": time_col, "resample": resample, **_file_identity(rec, path)}
+    return cached_response("timeseries.json", dataset_scope(dataset_id), parts, build)
 
 # ---------- CSV export ----------
 @app.get("/datasets/{dataset_id}/export")
@@ -453,12 +925,14 @@ def export_dataset_csv(
         raise HTTPException(status_code=404, detail=f"File not found on disk: {rec.stored_path}")
 
     try:
-        df = _read_csv_full(path)
+        df = _read_csv_full(path, timestamp=False)
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Failed to read CSV: {e}")
 
     if columns:
         keep = [c.strip() for c in columns.split(",") if c.strip()]
+        if TIMESTAMP_COL in keep and TIMESTAMP_COL not in df.columns:
+            _with_timestamp(df, path)  # derived column only when explicitly requested
         missing = [c for c in keep if c not in df.columns]
         if missing:
             raise HTTPException(status_code=400, detail=f"Columns not found: {missing}")
@@ -474,7 +948,7 @@ def export_dataset_csv(
     def _iter():
         yield df.to_csv(index=False)
 
-    filename = Path(rec.original_name).with_suffix(".filtered.csv").name
+    filename = Path(plain_name(rec.original_name)).with_suffix(".filtered.csv").name
     headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
     return StreamingResponse(_iter(), media_type="text/csv", headers=headers)
 
@@ -509,70 +983,74 @@ def dataset_geojson(
     if not path.exists():
         raise HTTPException(status_code=404, detail=f"File not found on disk: {rec.stored_path}")
 
-    try:
-        df = _read_csv_sample(path, max_rows=max(1000, min(limit * 5, 50000)))
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Failed to read CSV: {e}")
-
-    # map canonical aliases (from earlier helpers)
-    mapping = _normalize_columns(df)
-
-    # decide columns to use
-    lat_name = lat_col or mapping.get("latitude")
-    lon_name = lon_col or mapping.get("longitude")
-    if not lat_name or not lon_name:
-        raise HTTPException(status_code=400, detail="Latitude/Longitude columns not found. Provide lat_col/lon_col or rename columns.")
-
-    t_name = time_col or mapping.get("time")
-
-    # numeric conversions + validity mask
-    lat = pd.to_numeric(df[lat_name], errors="coerce")
-    lon = pd.to_numeric(df[lon_name], errors="coerce")
-    mask = ~(lat.isna() | lon.isna() | (lat < -90) | (lat > 90) | (lon < -180) | (lon > 180))
-
-    # optional bbox filter
-    if bbox:
+    def build() -> Response:
         try:
-            mnL, mnA, mxL, mxA = [float(x) for x in bbox.split(",")]
-        except Exception:
-            raise HTTPException(status_code=400, detail="Invalid bbox. Use 'minLon,minLat,maxLon,maxLat'.")
-        mask &= (lon >= mnL) & (lon <= mxL) & (lat >= mnA) & (lat <= mxA)
-
-    d = df.loc[mask].copy()
-    if d.empty:
-        return {"type": "FeatureCollection", "features": []}
-
-    # choose value columns to include in properties
-    props_cols: List[str] = []
-    if value_cols:
-        for c in [c.strip() for c in value_cols.split(",") if c.strip()]:
-            if c in d.columns:
-                props_cols.append(c)
-
-    # time column (optional)
-    if t_name and t_name in d.columns:
-        t_ser = pd.to_datetime(d[t_name], errors="coerce", utc=True)
-    else:
-        t_ser = None
-
-    # build features (cap by limit for responsiveness)
-    feats = []
-    for i, row in d.head(limit).iterrows():
-        props: dict = {}
-        if t_ser is not None:
-            ts = t_ser.loc[i]
-            if pd.notna(ts):
-                props["time"] = ts.isoformat()
-        for c in props_cols:
-            val = row[c]
-            if pd.isna(val):
-                continue
-            props[c] = float(val) if isinstance(val, (int, float, np.number)) else str(val)
-
-        feats.append({
-            "type": "Feature",
-            "geometry": {"type": "Point", "coordinates": [float(row[lon_name]), float(row[lat_name])]},
-            "properties": props
-        })
-
-    return {"type": "FeatureCollection", "features": feats}
+            df = _read_csv_sample(path, max_rows=max(1000, min(limit * 5, 50000)))
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=f"Failed to read CSV: {e}")
+
+        # map canonical aliases (from earlier helpers)
+        mapping = _normalize_columns(df)
+
+        # decide columns to use
+        lat_name = lat_col or mapping.get("latitude")
+        lon_name = lon_col or mapping.get("longitude")
+        if not lat_name or not lon_name:
+            raise HTTPException(status_code=400, detail="Latitude/Longitude columns not found. Provide lat_col/lon_col or rename columns.")
+
+        t_all, _ = _time_values(df, path, time_col)
+
+        # numeric conversions + validity mask
+        lat = pd.to_numeric(df[lat_name], errors="coerce")
+        lon = pd.to_numeric(df[lon_name], errors="coerce")
+        mask = ~(lat.isna() | lon.isna() | (lat < -90) | (lat > 90) | (lon < -180) | (lon > 180))
+
+        # optional bbox filter
+        if bbox:
+            try:
+                mnL, mnA, mxL, mxA = [float(x) for x in bbox.split(",")]
+            except Exception:
+                raise HTTPException(status_code=400, detail="Invalid bbox. Use 'minLon,minLat,maxLon,maxLat'.")
+            mask &= (lon >= mnL) & (lon <= mxL) & (lat >= mnA) & (lat <= mxA)
+
+        d = df.loc[mask].copy()
+        if d.empty:
+            return _json({"type": "FeatureCollection", "features": []})
+
+        # choose value columns to include in properties
+        props_cols: List[str] = []
+        if value_cols:
+            for c in [c.strip() for c in value_cols.split(",") if c.strip()]:
+                if c in d.columns:
+                    props_cols.append(c)
+
+        # time column (optional; parsed once over the sample with a cached format)
+        t_ser = t_all.loc[mask] if t_all is not None else None
+
+        # build features (cap by limit for responsiveness)
+        feats = []
+        for i, row in d.head(limit).iterrows():
+            props: dict = {}
+            if t_ser is not None:
+                ts = t_ser.loc[i]
+                if pd.notna(ts):
+                    props["time"] = ts.isoformat()
+            for c in props_cols:
+                val = row[c]
+                if pd.isna(val):
+                    continue
+                props[c] = float(val) if isinstance(val, (int, float, np.number)) else str(val)
+
+            feats.append({
+                "type": "Feature",
+                "geometry": {"type": "Point", "coordinates": [float(row[lon_name]), float(row[lat_name])]},
+                "properties": props
+            })
+
+        return _json({"type": "FeatureCollection", "features": feats})
+
+    parts = {
+        "lat_col": lat_col, "lon_col": lon_col, "time_col": time_col, "value_cols": value_cols,
+        "limit": limit, "bbox": bbox, **_file_identity(rec, path),
+    }
+    return cached_response("geojson", dataset_scope(dataset_id), parts, build)
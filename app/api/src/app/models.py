@@ -1,8 +1,14 @@
 # app/api/src/app/models.py
+from datetime import datetime
 from typing import Optional
+from sqlalchemy import Index
 from sqlmodel import SQLModel, Field
 
 class Job(SQLModel, table=True):
+    __table_args__ = (
+        Index("ix_job_dataset_status_created", "dataset_id", "status", "created_at"),
+        Index("ix_job_created_id", "created_at", "id"),
+    )
     id: str = Field(primary_key=True)        # rq job id
     dataset_id: int
     file_path: str                           # e.g., data/raw/1/water.csv
@@ -10,3 +16,37 @@ class Job(SQLModel, table=True):
     status: str = "queued"                   # queued|started|succeeded|failed
     result_path: Optional[str] = None        # relative path to output in container, e.g., data/processed/1/...
     result_summary: Optional[str] = None     # JSON with quick stats
+    created_at: Optional[datetime] = Field(default_factory=datetime.utcnow)  # NULL only for pre-migration rows
+
+class FileRecord(SQLModel, table=True):
+    # serves per-dataset listing pages and the "latest file" lookups (dataset_id, id desc)
+    __table_args__ = (Index("ix_filerecord_dataset_id_id", "dataset_id", "id"),)
+    id: Optional[int] = Field(default=None, primary_key=True)
+    dataset_id: int
+    original_name: str
+    stored_path: str                         # relative to /app (e.g., data/raw/1/file.csv)
+    bytes: int
+    ingest_sha256: Optional[str] = None      # of the stored bytes at ingest (appends do not rehash)
+
+class FileProfile(SQLModel, table=True):
+    file_id: int = Field(primary_key=True)   # FileRecord.id
+    row_count: int = 0
+    time_min: Optional[datetime] = None      # naive UTC
+    time_max: Optional[datetime] = None      # naive UTC
+    time_source: Optional[str] = None        # comma-joined source column(s) of the timestamp
+    column_stats: Optional[str] = None       # JSON {column: {count, sum, min, max}} (mergeable)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+class Rollup(SQLModel, table=True):
+    __table_args__ = (
+        Index("ix_rollup_file_freq_col_bucket", "file_id", "freq", "column_name", "bucket", unique=True),
+    )
+    id: Optional[int] = Field(default=None, primary_key=True)
+    file_id: int                             # FileRecord.id
+    freq: str                                # "H" | "D" | "M"
+    column_name: str
+    bucket: datetime                         # bucket start, naive UTC
+    count: int
+    sum: float                               # kept instead of mean so buckets merge incrementally
+    min: float
+    max: float
@@ -0,0 +1,244 @@
+# app/api/src/app/profiling.py
+"""Persisted per-file profile (row count, time range, column stats) and rollups.
+
+Everything stored here is mergeable (count/sum/min/max), so an append only
+needs to profile the new rows and fold them into the existing records; the
+cost scales with the batch, not with the file's history.
+"""
+from __future__ import annotations
+
+import json
+from datetime import datetime
+from typing import Hashable, Optional
+
+import pandas as pd
+from pandas.tseries.frequencies import to_offset
+from sqlalchemy import delete
+from sqlmodel import Session, select
+
+from app.models import FileProfile, Rollup
+from app.timeparse import TIMESTAMP_COL, attach_timestamp
+
+ROLLUP_FREQS = ("H", "D", "M")   # finest -> coarsest
+
+
+def naive_utc(ts) -> Optional[datetime]:
+    """Timestamp -> naive UTC datetime (how times are stored); naive input is taken as UTC."""
+    if ts is None or pd.isna(ts):
+        return None
+    ts = pd.Timestamp(ts)
+    return (ts.tz_convert(None) if ts.tzinfo else ts).to_pydatetime()
+
+
+def _numeric(df: pd.DataFrame) -> pd.DataFrame:
+    return df.drop(columns=[TIMESTAMP_COL], errors="ignore").select_dtypes("number")
+
+
+def column_stats(df: pd.DataFrame) -> dict:
+    """{column: {count, sum, min, max}} for the numeric columns of *df*."""
+    num = _numeric(df)
+    if num.columns.empty:
+        return {}
+    agg = num.agg(["count", "sum", "min", "max"])
+    out = {}
+    for c in num.columns:
+        n = int(agg.at["count", c])
+        out[c] = {
+            "count": n,
+            "sum": float(agg.at["sum", c]),
+            "min": float(agg.at["min", c]) if n else None,
+            "max": float(agg.at["max", c]) if n else None,
+        }
+    return out
+
+
+def coerce_profiled(df: pd.DataFrame, prof: Optional[FileProfile]) -> pd.DataFrame:
+    """Coerce the columns *prof* tracks as numeric in *df* (in place).
+
+    A stray text token then becomes NaN instead of turning the whole column into
+    text, as on the raw timeseries path.
+    """
+    known = json.loads(prof.column_stats) if prof and prof.column_stats else {}
+    for c in known:
+        if c in df.columns:
+            df[c] = pd.to_numeric(df[c], errors="coerce")
+    return df
+
+
+def merge_stats(old: dict, new: dict) -> dict:
+    merged = dict(old)
+    for c, s in new.items():
+        o = merged.get(c)
+        if not o:
+            merged[c] = s
+            continue
+        mins = [v for v in (o["min"], s["min"]) if v is not None]
+        maxs = [v for v in (o["max"], s["max"]) if v is not None]
+        merged[c] = {
+            "count": o["count"] + s["count"],
+            "sum": o["sum"] + s["sum"],
+            "min": min(mins) if mins else None,
+            "max": max(maxs) if maxs else None,
+        }
+    return merged
+
+
+def _bucket_start(ts: pd.Series, freq: str) -> pd.Series:
+    naive = ts.dt.tz_convert(None)
+    if freq == "M":
+        return naive.dt.to_period("M").dt.start_time
+    return naive.dt.floor(freq.lower() if freq == "H" else freq)
+
+
+def rollup_frame(df: pd.DataFrame, freq: str) -> pd.DataFrame:
+    """Long frame [column_name, bucket, count, sum, min, max] for one frequency."""
+    cols = ["column_name", "bucket", "count", "sum", "min", "max"]
+    if TIMESTAMP_COL not in df.columns:
+        return pd.DataFrame(columns=cols)
+    ts = df[TIMESTAMP_COL]
+    num = _numeric(df)[ts.notna()]
+    if num.empty or num.columns.empty:
+        return pd.DataFrame(columns=cols)
+    bucket = _bucket_start(ts[ts.notna()], freq).rename("bucket")
+    agg = num.groupby(bucket).agg(["count", "sum", "min", "max"])
+    long = agg.stack(level=0, future_stack=True).reset_index()
+    long = long.rename(columns={long.columns[1]: "column_name"})
+    return long.loc[long["count"] > 0, cols]
+
+
+def _merge_rollups(session: Session, file_id: int, freq: str, agg: pd.DataFrame, new: bool = False) -> None:
+    if agg.empty:
+        return
+    index: dict = {}
+    if not new:
+        lo, hi = agg["bucket"].min().to_pydatetime(), agg["bucket"].max().to_pydatetime()
+        existing = session.exec(
+            select(Rollup).where(
+                Rollup.file_id == file_id, Rollup.freq == freq,
+                Rollup.bucket >= lo, Rollup.bucket <= hi,
+            )
+        ).all()
+        index = {(r.column_name, r.bucket): r for r in existing}
+    for row in agg.to_dict("records"):
+        bucket = row["bucket"].to_pydatetime()
+        r = index.get((row["column_name"], bucket))
+        if r is None:
+            session.add(Rollup(
+                file_id=file_id, freq=freq, column_name=row["column_name"], bucket=bucket,
+                count=int(row["count"]), sum=float(row["sum"]), min=float(row["min"]), max=float(row["max"]),
+            ))
+            continue
+        r.count += int(row["count"])
+        r.sum += float(row["sum"])
+        r.min = min(r.min, float(row["min"]))
+        r.max = max(r.max, float(row["max"]))
+        session.add(r)
+
+
+def compute_profile(df: pd.DataFrame, key: Optional[Hashable] = None) -> dict:
+    """DB-free profile of *df* (stats, time range, rollup frames); safe to run in worker threads."""
+    sources = df.attrs.get("timestamp_sources") or attach_timestamp(df, key)
+    lo = hi = None
+    if TIMESTAMP_COL in df.columns:
+        lo, hi = naive_utc(df[TIMESTAMP_COL].min()), naive_utc(df[TIMESTAMP_COL].max())
+    return {
+        "rows": len(df),
+        "time_source": sources,
+        "time_min": lo,
+        "time_max": hi,
+        "stats": column_stats(df),
+        "rollups": {freq: rollup_frame(df, freq) for freq in ROLLUP_FREQS},
+    }
+
+
+def apply_profile(session: Session, file_id: int, delta: dict, new: bool = False) -> FileProfile:
+    """Fold a ``compute_profile`` result into the file's profile and rollups (caller commits).
+
+    *new* skips the lookup of existing rollups for a file that has none yet.
+    """
+    prof = (None if new else session.get(FileProfile, file_id)) or FileProfile(file_id=file_id)
+    if delta["time_source"] and not prof.time_source:
+        prof.time_source = ",".join(delta["time_source"])
+
+    stats = merge_stats(json.loads(prof.column_stats) if prof.column_stats else {}, delta["stats"])
+    prof.column_stats = json.dumps(stats)
+    prof.row_count += delta["rows"]
+    lo, hi = delta["time_min"], delta["time_max"]
+    if lo is not None:
+        prof.time_min = lo if prof.time_min is None else min(prof.time_min, lo)
+        prof.time_max = hi if prof.time_max is None else max(prof.time_max, hi)
+    prof.updated_at = datetime.utcnow()
+    session.add(prof)
+
+    for freq, agg in delta["rollups"].items():
+        _merge_rollups(session, file_id, freq, agg, new=new)
+    return prof
+
+
+def update_profile(session: Session, file_id: int, df: pd.DataFrame, key: Optional[Hashable] = None) -> FileProfile:
+    """Fold the rows of *df* into the file's profile and rollups (caller commits)."""
+    return apply_profile(session, file_id, compute_profile(df, key))
+
+
+def reset_profile(session: Session, file_id: int) -> None:
+    """Drop a file's profile and rollups (before a full rebuild)."""
+    prof = session.get(FileProfile, file_id)
+    if prof:
+        session.delete(prof)
+    session.execute(delete(Rollup).where(Rollup.file_id == file_id))
+    session.flush()
+
+
+def pick_rollup(rule: str) -> Optional[str]:
+    """Coarsest stored rollup whose buckets nest exactly inside *rule*'s bins.
+
+    Hour/day multiples map to H/D, weeks to D, month/quarter/year rules to M.
+    Returns None when no rollup fits (e.g. '15min'); callers then use raw rows.
+    """
+    try:
+        off = to_offset(rule)
+    except ValueError:
+        return None
+    if isinstance(off, (pd.offsets.MonthBegin, pd.offsets.MonthEnd, pd.offsets.QuarterBegin,
+                        pd.offsets.QuarterEnd, pd.offsets.YearBegin, pd.offsets.YearEnd)):
+        return "M"
+    if isinstance(off, pd.offsets.Week):
+        return "D"
+    if isinstance(off, pd.offsets.Tick):
+        if off.nanos % pd.Timedelta("1D").value == 0:
+            return "D"
+        if off.nanos % pd.Timedelta("1h").value == 0:
+            return "H"
+    return None
+
+
+def rollup_series(session: Session, file_id: int, column: str, freq: str, rule: str) -> pd.DataFrame:
+    """Re-bin stored rollups to *rule*: UTC-indexed frame with mean/min/max/count."""
+    rows = session.exec(
+        select(Rollup.bucket, Rollup.count, Rollup.sum, Rollup.min, Rollup.max)
+        .where(Rollup.file_id == file_id, Rollup.freq == freq, Rollup.column_name == column)
+        .order_by(Rollup.bucket)
+    ).all()
+    df = pd.DataFrame(rows, columns=["t", "count", "sum", "min", "max"])
+    if df.empty:
+        return pd.DataFrame(columns=["mean", "min", "max", "count"])
+    df["t"] = pd.to_datetime(df["t"], utc=True)
+    out = df.set_index("t").resample(rule).agg({"count": "sum", "sum": "sum", "min": "min", "max": "max"})
+    out["mean"] = out["sum"] / out["count"].where(out["count"] > 0)
+    return out[["mean", "min", "max", "count"]]
+
+
+def profile_summary(prof: FileProfile) -> dict:
+    stats = json.loads(prof.column_stats) if prof.column_stats else {}
+    return {
+        "file_id": prof.file_id,
+        "row_count": prof.row_count,
+        "time_min": prof.time_min.isoformat() + "Z" if prof.time_min else None,
+        "time_max": prof.time_max.isoformat() + "Z" if prof.time_max else None,
+        "time_source": prof.time_source.split(",") if prof.time_source else [],
+        "columns": {
+            c: {**s, "mean": s["sum"] / s["count"] if s["count"] else None}
+            for c, s in stats.items()
+        },
+        "updated_at": prof.updated_at.isoformat() + "Z",
+    }
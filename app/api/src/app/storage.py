@@ -0,0 +1,191 @@
+# app/api/src/app/storage.py
+"""Raw-file storage helpers: transparent (de)compression for uploaded CSVs.
+
+Uploads may arrive as plain ``.csv``, ``.csv.gz``, ``.csv.zst`` or ``.zip``.
+Every reader goes through ``open_raw`` which decompresses on the fly, so only
+the bytes actually consumed (e.g. a preview's first chunk) get inflated.
+
+Plain uploads can optionally be compressed at rest (``RAW_COMPRESSION``).
+They are written as a sequence of independent frames (multi-member gzip /
+multi-frame zstd), which stay valid single files for any standard tool and
+let new rows be appended as extra frames without rewriting the file.
+"""
+from __future__ import annotations
+
+import gzip
+import hashlib
+import itertools
+import os
+import shutil
+import tarfile
+import zipfile
+from pathlib import Path, PurePosixPath
+from typing import BinaryIO, Iterator
+
+# none | gzip | zstd  (applied to plain uploads only; compressed uploads are kept as sent)
+RAW_COMPRESSION = os.getenv("RAW_COMPRESSION", "none").lower()
+# Uncompressed bytes per independent frame when compressing at rest
+RAW_FRAME_BYTES = int(os.getenv("RAW_FRAME_BYTES", str(1 << 20)))
+
+_SUFFIXES = {".gz": "gzip", ".zst": "zstd", ".zip": "zip"}
+_EXT = {"gzip": ".gz", "zstd": ".zst"}
+
+# bundles accepted by the archive upload endpoint
+ARCHIVE_SUFFIXES = (".zip", ".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tar.xz")
+CSV_SUFFIXES = (".csv", ".csv.gz", ".csv.zst")
+
+
+def _zstd():
+    try:
+        import zstandard
+    except ImportError:  # pragma: no cover - depends on the image
+        raise RuntimeError("zstandard is not installed; cannot handle .zst files")
+    return zstandard
+
+
+def compression_of(path: Path | str) -> str | None:
+    """Return 'gzip' | 'zstd' | 'zip' based on the file suffix, or None for plain files."""
+    return _SUFFIXES.get(Path(path).suffix.lower())
+
+
+def plain_name(name: str) -> str:
+    """'water.csv.gz' -> 'water.csv', 'bundle.zip' -> 'bundle.csv'."""
+    p = Path(name)
+    kind = compression_of(p)
+    if kind == "zip":
+        return p.with_suffix(".csv").name
+    if kind:
+        return p.with_suffix("").name
+    return p.name
+
+
+def _zip_member(zf: zipfile.ZipFile) -> str:
+    names = [i.filename for i in zf.infolist() if not i.is_dir()]
+    for n in names:
+        if n.lower().endswith(".csv"):
+            return n
+    if not names:
+        raise ValueError("Zip archive is empty")
+    return names[0]
+
+
+def open_raw(path: Path) -> BinaryIO:
+    """Open a stored raw file as a decompressed binary stream."""
+    kind = compression_of(path)
+    if kind == "gzip":
+        return gzip.open(path, "rb")
+    if kind == "zstd":
+        dctx = _zstd().ZstdDecompressor()
+        return dctx.stream_reader(path.open("rb"), read_across_frames=True, closefd=True)
+    if kind == "zip":
+        # the member stream keeps the underlying file open after the ZipFile closes
+        with zipfile.ZipFile(path) as zf:
+            return zf.open(_zip_member(zf))
+    return path.open("rb")
+
+
+def read_head(path: Path, nbytes: int) -> bytes:
+    """First *nbytes* of decompressed content (only that much is inflated)."""
+    with open_raw(path) as fh:
+        return fh.read(nbytes)
+
+
+def compress_frame(chunk: bytes, kind: str) -> bytes:
+    """Compress *chunk* as one self-contained gzip member / zstd frame."""
+    if kind == "gzip":
+        return gzip.compress(chunk, mtime=0)
+    if kind == "zstd":
+        return _zstd().ZstdCompressor().compress(chunk)
+    raise ValueError(f"Unsupported compression: {kind}")
+
+
+def _create_new(target: Path) -> tuple[BinaryIO, Path]:
+    """Open a file that does not exist yet: *target*, else 'name-1.csv', 'name-2.csv', ...
+
+    Stored files are never overwritten, since existing records point at them.
+    """
+    p, ext = Path(target.name), ""
+    if compression_of(p):
+        ext, p = p.suffix, Path(p.stem)
+    if p.suffix.lower() == ".csv":
+        ext, p = p.suffix + ext, Path(p.stem)
+    for i in itertools.count():
+        path = target if i == 0 else target.with_name(f"{p.name}-{i}{ext}")
+        try:
+            return path.open("xb"), path
+        except FileExistsError:
+            continue
+
+
+def save_upload(src: BinaryIO, target: Path) -> Path:
+    """Stream *src* to *target*, compressing plain files at rest if configured.
+
+    Returns the path actually written: it may carry an extra .gz/.zst suffix, and
+    gets a numbered suffix if the name is already taken (see ``_create_new``).
+    """
+    kind = RAW_COMPRESSION if RAW_COMPRESSION in _EXT else None
+    if compression_of(target) or not kind:
+        out, target = _create_new(target)
+        with out:
+            shutil.copyfileobj(src, out, 1 << 20)
+    else:
+        out, target = _create_new(target.with_name(target.name + _EXT[kind]))
+        with out:
+            while chunk := src.read(RAW_FRAME_BYTES):
+                out.write(compress_frame(chunk, kind))
+
+    if compression_of(target) == "zip":
+        try:
+            with zipfile.ZipFile(target) as zf:
+                _zip_member(zf)
+        except (zipfile.BadZipFile, ValueError):
+            target.unlink(missing_ok=True)
+            raise ValueError("Upload is not a readable zip archive")
+    return target
+
+
+def file_sha256(path: Path) -> str:
+    """Hex SHA-256 of the stored bytes."""
+    h = hashlib.sha256()
+    with path.open("rb") as fh:
+        while chunk := fh.read(1 << 20):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def member_name(name: str) -> str | None:
+    """Flat storage name for an archive member ('leg1/ctd.csv' -> 'leg1__ctd.csv').
+
+    Returns None for members that are not CSVs (or are OS metadata files).
+    """
+    parts = [p for p in PurePosixPath(name.replace("\\", "/")).parts if p not in ("", ".", "..", "/")]
+    if not parts or parts[0] == "__MACOSX" or parts[-1].startswith("."):
+        return None
+    if not parts[-1].lower().endswith(CSV_SUFFIXES):
+        return None
+    return "__".join(parts)
+
+
+def iter_archive(src: BinaryIO, filename: str) -> Iterator[tuple[str, BinaryIO]]:
+    """Yield (member name, stream) for each regular file of a zip/tar bundle, in order.
+
+    Tar bundles are read as a forward-only stream; zip needs a seekable *src*.
+    """
+    lower = filename.lower()
+    if lower.endswith(".zip"):
+        with zipfile.ZipFile(src) as zf:
+            for info in zf.infolist():
+                if info.is_dir():
+                    continue
+                with zf.open(info) as fh:
+                    yield info.filename, fh
+    elif lower.endswith(ARCHIVE_SUFFIXES):
+        with tarfile.open(fileobj=src, mode="r|*") as tf:
+            for m in tf:
+                if not m.isfile():
+                    continue
+                fh = tf.extractfile(m)
+                if fh is not None:
+                    yield m.name, fh
+    else:
+        raise ValueError(f"Unsupported archive type (expected one of {', '.join(ARCHIVE_SUFFIXES)})")
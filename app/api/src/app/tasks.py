@@ -4,11 +4,14 @@ from pathlib import Path
 from datetime import datetime
 
 import pandas as pd
-from sqlmodel import Session
+from sqlmodel import Session, select
 from rq import get_current_job
 
 from app.db import engine
-from app.models import Job  # Job model is defined in app/models.py
+from app.models import Job, FileRecord, FileProfile  # shared models live in app/models.py
+from app.storage import open_raw, plain_name
+from app.profiling import coerce_profiled, reset_profile, update_profile
+from app.cache import invalidate, dataset_scope
 
 RAW_DIR = Path(os.getenv("DATA_DIR", "/app/data/raw"))
 PROC_DIR = Path(os.getenv("DATA_PROCESSED", "/app/data/processed"))
@@ -26,8 +29,11 @@ def _log(job_id: str, msg: str):
         f.write(f"[{ts}] {msg}\n")
 
 
-def process_csv(dataset_id: int, file_rel_path: str, y: str = "temperature") -> dict:
-    """Demo job: read CSV, compute quick stats, write a processed file, and log steps."""
+def process_csv(dataset_id: int, file_rel_path: str, y: str = "temperature", file_id: int | None = None) -> dict:
+    """Demo job: read CSV, compute quick stats, write a processed file, and log steps.
+
+    With *file_id*, also rebuilds the file's persisted profile and hourly/daily/monthly rollups.
+    """
     job = get_current_job()
     job_id = job.id if job else "nojob"
 
@@ -37,10 +43,11 @@ def process_csv(dataset_id: int, file_rel_path: str, y: str = "temperature") ->
     src = Path("/app") / file_rel_path            # e.g., data/raw/1/water.csv
     out_dir = PROC_DIR / str(dataset_id)
     out_dir.mkdir(parents=True, exist_ok=True)
-    out_csv = out_dir / f"processed_{Path(file_rel_path).name}"
+    out_csv = out_dir / f"processed_{plain_name(Path(file_rel_path).name)}"
 
-    # read & compute
-    df = pd.read_csv(src)
+    # read & compute (raw file may be .gz/.zst/.zip; decompressed on the fly)
+    with open_raw(src) as fh:
+        df = pd.read_csv(fh)
     if y not in df.columns:
         _log(job_id, f"ERROR: column '{y}' not found. Available: {list(df.columns)[:10]}...")
         raise ValueError(f"Column '{y}' not in file")
@@ -62,6 +69,17 @@ def process_csv(dataset_id: int, file_rel_path: str, y: str = "temperature") ->
 
     # record back to DB
     with Session(engine) as session:
+        if file_id is not None:
+            # same row lock as append_rows, and re-read under it, so an append
+            # committed after the read above is not lost from the rebuilt rollups
+            session.exec(select(FileRecord).where(FileRecord.id == file_id).with_for_update()).one()
+            with open_raw(src) as fh:
+                full = coerce_profiled(pd.read_csv(fh), session.get(FileProfile, file_id))
+            reset_profile(session, file_id)
+            prof = update_profile(session, file_id, full)
+            session.commit()
+            invalidate(dataset_scope(dataset_id))
+            _log(job_id, f"Rollups rebuilt for file {file_id} ({prof.row_count} rows)")
         db_job = session.get(Job, job_id)
         if db_job:
             db_job.status = "succeeded"
@@ -0,0 +1,147 @@
+# app/api/src/app/timeparse.py
+"""Timestamp engine: explicit-format, vectorized date/time parsing.
+
+``pd.to_datetime(..., errors="coerce")`` without a format falls back to slow
+per-element parsing. Instead we infer an explicit format once per file (on a
+small sample of distinct values), cache it, and parse the whole column in a
+single vectorized call. Split ``date`` + ``time`` columns (e.g. "23-Apr-25" and
+"1:23:00 PM") are combined into one UTC column named ``TIMESTAMP_COL``.
+"""
+from __future__ import annotations
+
+from typing import Hashable, Optional
+
+import pandas as pd
+
+TIMESTAMP_COL = "timestamp_utc"
+
+DATE_FORMATS = [
+    "%Y-%m-%d", "%d-%b-%y", "%d-%b-%Y", "%d/%m/%Y", "%m/%d/%Y",
+    "%Y/%m/%d", "%d.%m.%Y", "%d/%m/%y", "%m/%d/%y", "%Y%m%d",
+]
+TIME_FORMATS = [
+    "%H:%M:%S", "%H:%M", "%I:%M:%S %p", "%I:%M %p", "%H:%M:%S.%f",
+]
+DATETIME_FORMATS = (
+    ["ISO8601"]
+    + [f"{d} {t}" for d in DATE_FORMATS for t in TIME_FORMATS]
+    + DATE_FORMATS
+)
+
+# column aliases (lower-case) used to locate the source columns
+DATETIME_ALIASES = ["datetime", "timestamp", "sample_time", "time"]
+DATE_ALIASES = ["date", "sample_date"]
+TIME_ALIASES = ["time", "time_of_day", "sample_time"]
+
+SAMPLE_SIZE = 200
+# share of the sample the candidate formats must cover together; rows the chosen
+# format rejects are re-parsed element-wise, so files mixing formats still work
+MIN_SHARE = 0.8
+_CACHE_MAX = 1024
+_PLANS: dict[tuple, Optional[str]] = {}
+
+
+def _sample(s: pd.Series) -> pd.Series:
+    vals = s.dropna().astype(str).str.strip()
+    vals = vals[vals != ""]
+    return pd.Series(vals.unique()[:SAMPLE_SIZE])
+
+
+def infer_format(s: pd.Series, candidates: list[str]) -> Optional[str]:
+    """Candidate format covering most of the sample, or None.
+
+    A format that parses every sampled value wins outright. Otherwise the best
+    one is returned as long as the candidates together cover ``MIN_SHARE`` of
+    the sample (e.g. times written both as '10:00:00' and '10:00').
+    """
+    sample = _sample(s)
+    if sample.empty:
+        return None
+    best, best_hits = None, 0
+    covered = pd.Series(False, index=sample.index)
+    for fmt in candidates:
+        ok = pd.to_datetime(sample, format=fmt, errors="coerce").notna()
+        if ok.all():
+            return fmt
+        covered |= ok
+        if ok.sum() > best_hits:
+            best, best_hits = fmt, int(ok.sum())
+    return best if covered.mean() >= MIN_SHARE else None
+
+
+def _cached_format(key: Optional[Hashable], part: tuple, s: pd.Series, candidates: list[str]) -> Optional[str]:
+    if key is None:
+        return infer_format(s, candidates)
+    k = (key, part)
+    if k not in _PLANS:
+        if len(_PLANS) >= _CACHE_MAX:
+            _PLANS.clear()
+        _PLANS[k] = infer_format(s, candidates)
+    return _PLANS[k]
+
+
+def _to_utc(values: pd.Series, fmt: Optional[str]) -> pd.Series:
+    if fmt is None:
+        # nothing matched the sample: last-resort per-element parsing
+        return pd.to_datetime(values, format="mixed", errors="coerce", utc=True)
+    out = pd.to_datetime(values, format=fmt, errors="coerce", utc=True)
+    # values the cached format rejects (other formats, rows past the sample) are
+    # re-parsed element-wise instead of being dropped
+    miss = out.isna() & values.fillna("").ne("")
+    if miss.any():
+        out[miss] = pd.to_datetime(values[miss], format="mixed", errors="coerce", utc=True)
+    return out
+
+
+def parse_column(df: pd.DataFrame, col: str, key: Optional[Hashable] = None) -> pd.Series:
+    """Parse one column to UTC timestamps using a cached explicit format."""
+    s = df[col]
+    if pd.api.types.is_datetime64_any_dtype(s):
+        return pd.to_datetime(s, utc=True)
+    fmt = _cached_format(key, ("col", col), s, DATETIME_FORMATS)
+    return _to_utc(s.astype("string").str.strip(), fmt)
+
+
+def _find(df: pd.DataFrame, aliases: list[str]) -> Optional[str]:
+    lower = {c.lower(): c for c in df.columns}
+    for a in aliases:
+        if a in lower:
+            return lower[a]
+    return None
+
+
+def attach_timestamp(df: pd.DataFrame, key: Optional[Hashable] = None) -> list[str]:
+    """Add ``TIMESTAMP_COL`` (UTC) to *df* in place.
+
+    Prefers split date + time columns, then a single datetime-like column.
+    Returns the source column names used (empty list if none were usable).
+    *key* identifies the file (e.g. path + mtime) so format inference runs once.
+    """
+    if TIMESTAMP_COL in df.columns:
+        return [TIMESTAMP_COL]
+
+    date_col = _find(df, DATE_ALIASES)
+    time_col = _find(df, TIME_ALIASES)
+    if date_col and time_col and date_col != time_col:
+        d, t = df[date_col], df[time_col]
+        dfmt = _cached_format(key, ("date", date_col), d, DATE_FORMATS)
+        tfmt = _cached_format(key, ("time", time_col), t, TIME_FORMATS)
+        if dfmt and tfmt:
+            d = d.astype("string").str.strip()
+            t = t.astype("string").str.strip()
+            # missing time-of-day -> midnight, keeps date-only rows usable
+            t = t.fillna("00:00:00") if tfmt.startswith("%H") else t.fillna("12:00:00 AM")
+            df[TIMESTAMP_COL] = _to_utc(d + " " + t, f"{dfmt} {tfmt}")
+            return [date_col, time_col]
+
+    for col in [_find(df, DATETIME_ALIASES), date_col]:
+        if not col:
+            continue
+        if pd.api.types.is_datetime64_any_dtype(df[col]):
+            df[TIMESTAMP_COL] = pd.to_datetime(df[col], utc=True)
+            return [col]
+        fmt = _cached_format(key, ("col", col), df[col], DATETIME_FORMATS)
+        if fmt:
+            df[TIMESTAMP_COL] = _to_utc(df[col].astype("string").str.strip(), fmt)
+            return [col]
+    return []